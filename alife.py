@@ -3,20 +3,60 @@ import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 import numpy as np
 import copy
+import itertools
+import math
+
+from spatial import SpatialMetrics, block_edges
+from stats import PopulationStats
 
 # =========== Constants ============
 
 ARRSIZE = 100
 FIGSIZE = 8
+COLORS = ["black", "green", "white", "red"]  # bare, grass, rabbit, fox
+LEVEL_OF_DETAIL = True  # draw only the visible window, reduced to screen pixels
 INIT_RABBITS = 100
 INIT_FOXES = 100
 GRASS_RATE = 0.08
 OFFSPRING = 2
 STARVATION_LEVEL = 2
 REPRODUCTION_LEVEL = 1
+FUSED = True  # run generations with the fused single-pass kernel
+TRACK_IDS = False  # give every animal an id and parent id (needed for lineage.py)
+TILE = 64  # tile size of the chunked (lazily allocated) grass field
+
+# constants that configure() is allowed to override
+PARAMETERS = (
+    "ARRSIZE",
+    "INIT_RABBITS",
+    "INIT_FOXES",
+    "GRASS_RATE",
+    "OFFSPRING",
+    "STARVATION_LEVEL",
+    "REPRODUCTION_LEVEL",
+)
+
+
+def configure(**params):
+    """
+    Override model constants, e.g. configure(GRASS_RATE=0.1, OFFSPRING=3).
+    Used by the calibration and batch tools so that every run in a process
+    can have its own settings.
+    """
+    for name, value in params.items():
+        if name not in PARAMETERS:
+            raise KeyError(f"unknown parameter {name!r}")
+        globals()[name] = value
+
+
+def current_parameters():
+    """The model constants currently in effect"""
+    return {name: globals()[name] for name in PARAMETERS}
 
 # =========== Animal Section ============
 
+_animal_ids = itertools.count()
+
 
 class Animal:
     def __init__(self):
@@ -25,20 +65,32 @@ class Animal:
         self.reproduction_level = REPRODUCTION_LEVEL
         self.hunger = 0
         self.alive = True
+        self.eaten = False  # set when a predator kills it, else death is starvation
         self.x = rnd.randrange(0, ARRSIZE)
         self.y = rnd.randrange(0, ARRSIZE)
+        self.id = next(_animal_ids) if TRACK_IDS else None
+        self.parent_id = None
+        self.traced = False  # set by a TrajectoryRecorder, inherited by offspring
 
-    def reproduce(self, parent: object):
+    def reproduce(self, parent: object, draw=None):
         """
         Reproduce only if hunger level is at or below reproduction_level.
         PDF Requirement: "Animals can only reproduce if the amount they have
         eaten is at least as high as the reproduction level."
         Interpretation: Low hunger = well-fed = can reproduce
+        draw: optional pre-drawn uniform number for the litter size
         """
         if parent.hunger <= parent.reproduction_level:
-            return [
-                copy.deepcopy(parent) for i in range(rnd.randint(1, self.max_offspring))
-            ]
+            if draw is None:
+                litter = rnd.randint(1, self.max_offspring)
+            else:
+                litter = 1 + int(draw * self.max_offspring)
+            babies = [copy.deepcopy(parent) for i in range(litter)]
+            if parent.id is not None:
+                for baby in babies:
+                    baby.id = next(_animal_ids)
+                    baby.parent_id = parent.id
+            return babies
         return []
 
     def eat(self, to_eat=None):
@@ -50,40 +102,241 @@ class Animal:
         if to_eat:
             if isinstance(to_eat, object):
                 to_eat.alive = False
+                to_eat.eaten = True
+
+    def move(self, step=None):
+        """Move up, down, left, right randomly (step: optional pre-drawn (dx, dy))"""
+        if step is None:
+            self.x = (self.x + rnd.choice([-1, 0, 1])) % ARRSIZE
+            self.y = (self.y + rnd.choice([-1, 0, 1])) % ARRSIZE
+        else:
+            self.x = (self.x + step[0]) % ARRSIZE
+            self.y = (self.y + step[1]) % ARRSIZE
+
+
+# =========== Grass Section ============
+
+
+class ChunkedGrass:
+    """
+    Grass field stored as TILE x TILE tiles that are allocated on first use.
+
+    Each tile holds, per cell, the grow phase at which its grass is back
+    (0 = grass now). When a cell is eaten, the number of grow phases until
+    it regrows is drawn once from the geometric distribution with
+    success probability GRASS_RATE, which is exactly the waiting time of the
+    dense field's per-generation coin flips. Nothing is drawn after that, so
+    idle tiles cost nothing per generation and reading the field (display,
+    metrics, keyframes) never touches the random numbers of the run.
+
+    A tile that has never been eaten from, or has fully grown back, is not
+    stored at all and reads as all grass. Indexed like the dense array,
+    grass[x, y], and np.asarray(grass) gives the dense equivalent.
+    """
 
-    def move(self):
-        """Move up, down, left, right randomly"""
-        self.x = (self.x + rnd.choice([-1, 0, 1])) % ARRSIZE
-        self.y = (self.y + rnd.choice([-1, 0, 1])) % ARRSIZE
+    def __init__(self, size, tile=TILE, sweep_every=None):
+        self.size = size
+        self.shape = (size, size)
+        self.tile = tile
+        self.tiles = {}  # (tx, ty) -> int32 array of the phase each cell regrows at
+        self.clock = 0  # grow phases so far
+        self.sweep_every = sweep_every or tile
+        self.random = np.random.random_sample  # RandomStream.random when a Field has one
+
+    def _regrow_at(self):
+        """Grow phase at which a cell eaten now has grass again"""
+        if GRASS_RATE >= 1:
+            return self.clock + 1
+        if GRASS_RATE <= 0:
+            return np.iinfo(np.int32).max
+        u = 1.0 - self.random()  # in (0, 1]
+        return self.clock + 1 + int(math.log(u) / math.log(1 - GRASS_RATE))
+
+    def __getitem__(self, pos):
+        x, y = pos
+        tile = self.tiles.get((x // self.tile, y // self.tile))
+        if tile is None:
+            return 1
+        return 1 if tile[x % self.tile, y % self.tile] <= self.clock else 0
+
+    def __setitem__(self, pos, value):
+        x, y = pos
+        key = (x // self.tile, y // self.tile)
+        tile = self.tiles.get(key)
+        if tile is None:
+            if value:
+                return
+            height = min(self.tile, self.size - key[0] * self.tile)
+            width = min(self.tile, self.size - key[1] * self.tile)
+            tile = self.tiles[key] = np.zeros((height, width), np.int32)
+        tile[x % self.tile, y % self.tile] = 0 if value else self._regrow_at()
+
+    def grow(self):
+        """
+        One grow phase. Only advances the clock, except every sweep_every
+        generations, when tiles that have fully grown back are released.
+        """
+        self.clock += 1
+        if self.clock % self.sweep_every == 0:
+            for key in [k for k, tile in self.tiles.items() if tile.max() <= self.clock]:
+                del self.tiles[key]
+
+    def region(self, r0, r1, c0, c1):
+        """Dense copy of grass[r0:r1, c0:c1]"""
+        out = np.ones((r1 - r0, c1 - c0))
+        for (tx, ty), tile in self.tiles.items():
+            x0, y0 = tx * self.tile, ty * self.tile
+            xs, xe = max(r0, x0), min(r1, x0 + tile.shape[0])
+            ys, ye = max(c0, y0), min(c1, y0 + tile.shape[1])
+            if xs < xe and ys < ye:
+                cells = tile[xs - x0 : xe - x0, ys - y0 : ye - y0]
+                out[xs - r0 : xe - r0, ys - c0 : ye - c0] = cells <= self.clock
+        return out
+
+    def __array__(self, dtype=None, copy=None):
+        out = self.region(0, self.size, 0, self.size)
+        return out if dtype is None else out.astype(dtype)
+
+    def region_mean(self, r_edges, r1, c_edges, c1):
+        """Grass cover of the blocks starting at r_edges x c_edges (ending at r1, c1)"""
+        heights = np.diff(np.append(r_edges, r1))
+        widths = np.diff(np.append(c_edges, c1))
+        bare = np.zeros((len(r_edges), len(c_edges)))
+        for (tx, ty), tile in self.tiles.items():
+            x0, y0 = tx * self.tile, ty * self.tile
+            if x0 >= r1 or y0 >= c1 or x0 + tile.shape[0] <= r_edges[0]:
+                continue
+            if y0 + tile.shape[1] <= c_edges[0]:
+                continue
+            xs, ys = np.nonzero(tile > self.clock)
+            xs, ys = xs + x0, ys + y0
+            inside = (xs >= r_edges[0]) & (xs < r1) & (ys >= c_edges[0]) & (ys < c1)
+            bx = np.searchsorted(r_edges, xs[inside], side="right") - 1
+            by = np.searchsorted(c_edges, ys[inside], side="right") - 1
+            np.add.at(bare, (bx, by), 1)
+        return 1 - bare / np.outer(heights, widths)
+
+    def block_mean(self, resolution):
+        """Grass cover per block without building the dense array (see spatial.py)"""
+        edges = block_edges(self.size, resolution)
+        return self.region_mean(edges, self.size, edges, self.size)
+
+    @property
+    def allocated_cells(self):
+        return sum(tile.size for tile in self.tiles.values())
 
 
 # =========== Field Section ============
 
 
 class Field:
-    def __init__(self):
-        self.field = np.ones((ARRSIZE, ARRSIZE))
+    def __init__(
+        self,
+        fused=False,
+        keep_history=True,
+        stats=False,
+        spatial_resolution=None,
+        chunked=False,
+        rng=None,
+    ):
+        # chunked=True allocates grass tiles lazily, for very large sparse worlds
+        self.chunked = chunked
+        self.field = ChunkedGrass(ARRSIZE) if chunked else np.ones((ARRSIZE, ARRSIZE))
+        self.fused = fused
         self.rabbits = []
         self.foxes = []
 
         # Time series tracking
+        # keep_history=False drops the raw series, use stats for summaries instead
+        self.keep_history = keep_history
         self.rabbit_history = []
         self.fox_history = []
         self.generation_count = 0
+        self.stats = PopulationStats() if stats else None
+        self.spatial = (
+            SpatialMetrics(spatial_resolution) if spatial_resolution else None
+        )
+        self.tracker = None
+
+        # rng: optional rng_stream.RandomStream, prefetching the per-generation
+        # draws on a background thread instead of using random / np.random
+        self.rng = rng
+        if rng is not None:
+            self.check_stream(rng)
+            if chunked:
+                self.field.random = rng.random
+        self.keyframes = None  # playback.KeyframeRecorder, see its attach()
+
+    def reset(self, stats=False, spatial_resolution=None):
+        """
+        Back to an empty generation 0 for another run, keeping the allocated
+        grass array when ARRSIZE has not changed (used by the job service).
+        """
+        if self.chunked:
+            self.field = ChunkedGrass(ARRSIZE)
+        elif self.field.shape == (ARRSIZE, ARRSIZE):
+            self.field.fill(1)
+        else:
+            self.field = np.ones((ARRSIZE, ARRSIZE))
+        self.rabbits.clear()
+        self.foxes.clear()
+        self.rabbit_history.clear()
+        self.fox_history.clear()
+        self.generation_count = 0
+        self.stats = PopulationStats() if stats else None
+        self.spatial = (
+            SpatialMetrics(spatial_resolution) if spatial_resolution else None
+        )
+        self.tracker = None
+        self.rng = None
+        self.keyframes = None
+
+    def check_stream(self, rng):
+        """The stream's grass mask must fit this field and the current GRASS_RATE"""
+        if self.chunked:
+            if rng.size is not None:
+                raise ValueError("a chunked field draws no grass mask, use size=None")
+        elif rng.size != ARRSIZE or rng.grass_rate != GRASS_RATE:
+            raise ValueError(
+                f"stream grass mask is size={rng.size}, grass_rate={rng.grass_rate}; "
+                f"the field needs size={ARRSIZE}, grass_rate={GRASS_RATE}"
+            )
 
     def add_rabbit(self, rabbit: object):
         self.rabbits.append(rabbit)
+        if self.tracker is not None:
+            self.tracker.consider(rabbit, "rabbit")
 
     def add_fox(self, fox: object):
         self.foxes.append(fox)
+        if self.tracker is not None:
+            self.tracker.consider(fox, "fox")
+
+    def trace(self, recorder):
+        """Start recording sampled trajectories (see lineage.TrajectoryRecorder)"""
+        self.tracker = recorder
+        recorder.attach(self)
+
+    def steps(self):
+        """Pre-drawn moves for every animal from the stream (Nones without one)"""
+        if self.rng is None:
+            return itertools.repeat(None)
+        return iter(self.rng.steps(len(self.rabbits) + len(self.foxes)).tolist())
+
+    def draws(self, n):
+        """Pre-drawn litter size draws for n animals (Nones without a stream)"""
+        if self.rng is None:
+            return itertools.repeat(None)
+        return iter(self.rng.uniform(n).tolist())
 
     def move_animals(self):
+        steps = self.steps()
         for r in self.rabbits:
             if r.alive:
-                r.move()
+                r.move(next(steps))
         for f in self.foxes:
             if f.alive:
-                f.move()
+                f.move(next(steps))
 
     def eat(self):
         """
@@ -129,17 +382,22 @@ class Field:
         Animals reproduce based on hunger level.
         Returns empty list if hunger is too high.
         """
+        draws = self.draws(len(self.rabbits) + len(self.foxes))
         new_rabbits = []
         for r in self.rabbits:
             if r.alive:
-                babies = r.reproduce(r)
+                babies = r.reproduce(r, next(draws))
                 new_rabbits.extend(babies)
+                if r.traced and babies:
+                    self.tracker.births(babies, "rabbit")
 
         new_foxes = []
         for f in self.foxes:
             if f.alive:
-                babies = f.reproduce(f)
+                babies = f.reproduce(f, next(draws))
                 new_foxes.extend(babies)
+                if f.traced and babies:
+                    self.tracker.births(babies, "fox")
 
         self.rabbits.extend(new_rabbits)
         self.foxes.extend(new_foxes)
@@ -160,8 +418,91 @@ class Field:
 
     def grow_grass(self):
         """Grass grows back with some probability at each location"""
-        new_grass = (np.random.rand(ARRSIZE, ARRSIZE) < GRASS_RATE) * 1
-        self.field = np.maximum(self.field, new_grass)
+        if self.chunked:
+            self.field.grow()
+            return
+        if self.rng is not None:
+            self.check_stream(self.rng)  # catches a configure() after construction
+            self.field[self.rng.grass_mask()] = 1
+            return
+        # written in place; same result as np.maximum with a 0/1 mask
+        self.field[np.random.rand(ARRSIZE, ARRSIZE) < GRASS_RATE] = 1
+
+    def move_and_eat(self):
+        """
+        Fused move + eat: one pass over rabbits, one pass over foxes.
+        Rabbits must all have moved and grazed before any fox hunts, so the
+        two species cannot share a pass. Random draws happen in the same
+        order as move_animals(), so a seeded run matches the phased one.
+        """
+        field = self.field
+        steps = self.steps()
+        rabbit_locations = {}
+        for r in self.rabbits:
+            if r.alive:
+                r.move(next(steps))
+                if field[r.x, r.y] != 0:
+                    r.eat()
+                    field[r.x, r.y] = 0
+                else:
+                    r.hunger += 1
+                pos = (r.x, r.y)
+                if pos in rabbit_locations:
+                    rabbit_locations[pos].append(r)
+                else:
+                    rabbit_locations[pos] = [r]
+
+        for f in self.foxes:
+            if f.alive:
+                f.move(next(steps))
+                rabbits_here = rabbit_locations.get((f.x, f.y))
+                if rabbits_here:
+                    f.eat(rabbits_here[0])
+                else:
+                    f.hunger += 1
+
+    def reproduce_and_survive(self, animals, species, draws):
+        """
+        Fused reproduce + survive for one population list.
+        Newborns are appended to the end of the list while the parents are
+        scanned, and the dead are compacted out in place (no new lists).
+        The survivor order matches reproduce() followed by survive().
+        """
+        n = len(animals)
+        keep = 0
+        for i in range(n):
+            animal = animals[i]
+            if animal.alive:
+                babies = animal.reproduce(animal, next(draws))
+                animals.extend(babies)
+                if animal.traced and babies:
+                    self.tracker.births(babies, species)
+                if animal.hunger >= animal.starvation_level:
+                    animal.alive = False
+                else:
+                    animals[keep] = animal
+                    keep += 1
+
+        for i in range(n, len(animals)):
+            animal = animals[i]
+            if animal.hunger >= animal.starvation_level:
+                animal.alive = False
+            else:
+                animals[keep] = animal
+                keep += 1
+        del animals[keep:]
+
+    def fused_generation(self):
+        """
+        One generation in the same phase order as the phased cycle, with the
+        populations scanned four times in total instead of the eight full
+        passes (plus the survive() concatenation and copies) of the phased one.
+        """
+        self.move_and_eat()
+        draws = self.draws(len(self.rabbits) + len(self.foxes))
+        self.reproduce_and_survive(self.rabbits, "rabbit", draws)
+        self.reproduce_and_survive(self.foxes, "fox", draws)
+        self.grow_grass()
 
     def generation(self):
         """
@@ -172,25 +513,56 @@ class Field:
         4. Survive (remove starved animals)
         5. Grow grass
         """
-        self.move_animals()
-        self.eat()
-        self.reproduce()
-        self.survive()
-        self.grow_grass()
+        if self.fused:
+            self.fused_generation()
+        else:
+            self.move_animals()
+            self.eat()
+            self.reproduce()
+            self.survive()
+            self.grow_grass()
 
         self.generation_count += 1
-        self.rabbit_history.append(len(self.rabbits))
-        self.fox_history.append(len(self.foxes))
-
-
-# =========== Animation ============
-def animate(i, field, img, ax_main, ax_time, line_rabbits, line_foxes):
+        if self.keep_history:
+            self.rabbit_history.append(len(self.rabbits))
+            self.fox_history.append(len(self.foxes))
+        if self.stats is not None:
+            self.stats.update(len(self.rabbits), len(self.foxes))
+        if self.spatial is not None:
+            self.spatial.update(self)
+        if self.tracker is not None:
+            self.tracker.record_generation(self)
+        if self.keyframes is not None:
+            self.keyframes.update(self)
+
+
+def populate(field):
     """
-    Animation function that updates both the field display and time series plot.
+    Add the initial rabbits and foxes and record generation 0.
+    Animal ids restart at 0, so a seeded run gets the same ids however
+    many runs the process has done before.
     """
-    field.generation()
+    global _animal_ids
+    _animal_ids = itertools.count()
+    for _ in range(INIT_RABBITS):
+        field.add_rabbit(Animal())
+
+    for _ in range(INIT_FOXES):
+        field.add_fox(Animal())
+
+    if field.keep_history:
+        field.rabbit_history.append(len(field.rabbits))
+        field.fox_history.append(len(field.foxes))
+    if field.stats is not None:
+        field.stats.update(len(field.rabbits), len(field.foxes))
+    if field.spatial is not None:
+        field.spatial.update(field)
 
-    display = field.field.copy()  # local for display
+
+# =========== Animation ============
+def compose(field):
+    """Display array: 0 = bare, 1 = grass, 2 = rabbit, 3 = fox"""
+    display = np.array(field.field, dtype=float)  # local for display
 
     for r in field.rabbits:
         if r.alive:
@@ -200,7 +572,123 @@ def animate(i, field, img, ax_main, ax_time, line_rabbits, line_foxes):
         if f.alive:
             display[f.y, f.x] = 3
 
-    img.set_array(display)
+    return display
+
+
+def compose_region(field, r0, r1, c0, c1):
+    """compose(field)[r0:r1, c0:c1] without building the whole frame"""
+    if isinstance(field.field, np.ndarray):
+        display = field.field[r0:r1, c0:c1].astype(float)
+    else:
+        display = field.field.region(r0, r1, c0, c1)
+
+    for animals, value in ((field.rabbits, 2), (field.foxes, 3)):
+        n = len(animals)
+        rows = np.fromiter((a.y for a in animals), np.int64, n)
+        cols = np.fromiter((a.x for a in animals), np.int64, n)
+        alive = np.fromiter((a.alive for a in animals), bool, n)
+        inside = alive & (rows >= r0) & (rows < r1) & (cols >= c0) & (cols < c1)
+        display[rows[inside] - r0, cols[inside] - c0] = value
+
+    return display
+
+
+def grass_cover(grass, r_edges, r1, c_edges, c1):
+    """Fraction of grass in the blocks starting at r_edges x c_edges (ending at r1, c1)"""
+    if not isinstance(grass, np.ndarray):
+        return grass.region_mean(r_edges, r1, c_edges, c1)
+    window = grass[r_edges[0] : r1, c_edges[0] : c1]
+    sums = np.add.reduceat(
+        np.add.reduceat(window, r_edges - r_edges[0], axis=0), c_edges - c_edges[0], axis=1
+    )
+    heights = np.diff(np.append(r_edges, r1))
+    widths = np.diff(np.append(c_edges, c1))
+    return sums / np.outer(heights, widths)
+
+
+def compose_reduced(field, r0, r1, c0, c1, rows, cols):
+    """
+    compose_region reduced to at most rows x cols blocks, built directly from
+    the grass and the animal coordinates (the full-detail window never exists).
+    A block shows a fox if it holds any fox, else a rabbit if it holds any
+    rabbit, else grass if at least half of it is grass, so animals never
+    disappear when the world is much larger than the screen.
+    """
+    if r1 - r0 <= rows and c1 - c0 <= cols:
+        return compose_region(field, r0, r1, c0, c1)
+    r_edges = r0 + block_edges(r1 - r0, min(rows, r1 - r0))
+    c_edges = c0 + block_edges(c1 - c0, min(cols, c1 - c0))
+    display = (grass_cover(field.field, r_edges, r1, c_edges, c1) >= 0.5).astype(float)
+
+    for animals, value in ((field.rabbits, 2), (field.foxes, 3)):  # foxes drawn last
+        n = len(animals)
+        ys = np.fromiter((a.y for a in animals), np.int64, n)
+        xs = np.fromiter((a.x for a in animals), np.int64, n)
+        alive = np.fromiter((a.alive for a in animals), bool, n)
+        inside = alive & (ys >= r0) & (ys < r1) & (xs >= c0) & (xs < c1)
+        block_rows = np.searchsorted(r_edges, ys[inside], side="right") - 1
+        block_cols = np.searchsorted(c_edges, xs[inside], side="right") - 1
+        display[block_rows, block_cols] = value
+
+    return display
+
+
+class LevelOfDetail:
+    """
+    Keeps an imshow of the field at screen resolution.
+    Each render composes only the part of the world inside the axes limits
+    and reduces it to the axes' size in pixels, so the cost per frame
+    depends on the window, not on ARRSIZE. Zooming (which changes the
+    limits) re-renders the new window at the higher detail it now allows.
+    """
+
+    def __init__(self, ax, img, size=None):
+        self.ax = ax
+        self.img = img
+        self.size = size or ARRSIZE
+        self.field = None
+        ax.set_xlim(-0.5, self.size - 0.5)
+        ax.set_ylim(self.size - 0.5, -0.5)
+        ax.set_autoscale_on(False)  # set_extent must not undo the user's zoom
+        ax.callbacks.connect("xlim_changed", self.on_zoom)
+        ax.callbacks.connect("ylim_changed", self.on_zoom)
+
+    def window(self):
+        """Visible cells as (r0, r1, c0, c1)"""
+        x0, x1 = sorted(self.ax.get_xlim())
+        y0, y1 = sorted(self.ax.get_ylim())
+        c0 = max(0, math.floor(x0 + 0.5))
+        c1 = min(self.size, math.ceil(x1 + 0.5))
+        r0 = max(0, math.floor(y0 + 0.5))
+        r1 = min(self.size, math.ceil(y1 + 0.5))
+        return r0, max(r1, r0 + 1), c0, max(c1, c0 + 1)
+
+    def render(self, field):
+        self.field = field
+        r0, r1, c0, c1 = self.window()
+        # the space the layout gives the axes, before imshow's aspect shrinks it
+        fig = self.ax.figure
+        box = self.ax.get_position(original=True).transformed(fig.transFigure)
+        rows, cols = max(1, int(box.height)), max(1, int(box.width))
+        self.img.set_data(compose_reduced(field, r0, r1, c0, c1, rows, cols))
+        self.img.set_extent((c0 - 0.5, c1 - 0.5, r1 - 0.5, r0 - 0.5))
+
+    def on_zoom(self, ax):
+        if self.field is not None:
+            self.render(self.field)
+            ax.figure.canvas.draw_idle()
+
+
+def animate(i, field, img, ax_main, ax_time, line_rabbits, line_foxes, lod=None):
+    """
+    Animation function that updates both the field display and time series plot.
+    """
+    field.generation()
+
+    if lod is not None:
+        lod.render(field)
+    else:
+        img.set_array(compose(field))
     ax_main.set_title(
         f"Generation {field.generation_count} | Rabbits: {len(field.rabbits)} Foxes: {len(field.foxes)}"
     )
@@ -222,24 +710,20 @@ def main():
     """
     Main function to initialize and run the simulation.
     """
-    field = Field()
-
-    for _ in range(INIT_RABBITS):
-        field.add_rabbit(Animal())
-
-    for _ in range(INIT_FOXES):
-        field.add_fox(Animal())
-
-    field.rabbit_history.append(len(field.rabbits))
-    field.fox_history.append(len(field.foxes))
+    field = Field(fused=FUSED)
+    populate(field)
 
     fig = plt.figure(figsize=(FIGSIZE * 2, FIGSIZE))
     ax_main = plt.subplot(1, 2, 1)
     ax_time = plt.subplot(1, 2, 2)
 
-    cmap = plt.cm.colors.ListedColormap(["black", "green", "white", "red"])
+    cmap = plt.cm.colors.ListedColormap(COLORS)
     img = ax_main.imshow(
-        field.field, cmap=cmap, vmin=0, vmax=3, interpolation="hamming"
+        compose(field) if not LEVEL_OF_DETAIL else np.zeros((1, 1)),
+        cmap=cmap,
+        vmin=0,
+        vmax=3,
+        interpolation="hamming",
     )
     ax_main.set_title(
         f"Generation {field.generation_count} | Rabbits: {INIT_RABBITS} Foxes: {INIT_FOXES}"
@@ -256,10 +740,15 @@ def main():
 
     plt.tight_layout()
 
+    lod = None
+    if LEVEL_OF_DETAIL:
+        lod = LevelOfDetail(ax_main, img)
+        lod.render(field)
+
     anim = animation.FuncAnimation(
         fig,
         animate,
-        fargs=(field, img, ax_main, ax_time, line_rabbits, line_foxes),
+        fargs=(field, img, ax_main, ax_time, line_rabbits, line_foxes, lod),
         frames=10**100,
         interval=200,
     )
@@ -0,0 +1,237 @@
+"""
+Parameter search for stable fox/rabbit configurations.
+
+Random candidates are drawn from the search space below and evaluated in
+parallel with successive halving: every candidate gets a short run, the
+best 1/eta of them get a run eta times longer, and so on up to the full
+length. Every candidate is run with several seeds. A run is abandoned as
+soon as a species dies out or, after the burn-in, a population exceeds the
+density cap, so unstable candidates cost only a few hundred generations.
+
+Stability score: the larger of the rabbit and fox coefficients of variation
+(std / mean) after the burn-in, over the merged stats of all seeds. Lower
+is steadier.
+
+Usage:
+    python calibrate.py --candidates 64 --workers 8 --max-generations 2000
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import random as rnd
+
+import numpy as np
+
+import alife
+from stats import PopulationStats, merge_all
+
+# (low, high) ranges; ints are sampled inclusively, floats uniformly
+SEARCH_SPACE = {
+    "GRASS_RATE": (0.01, 0.3),
+    "OFFSPRING": (1, 4),
+    "STARVATION_LEVEL": (1, 6),
+    "REPRODUCTION_LEVEL": (0, 4),
+    "INIT_RABBITS": (20, 500),
+    "INIT_FOXES": (10, 300),
+}
+
+
+def sample_candidates(n, seed=0, space=SEARCH_SPACE):
+    """Draw n random parameter sets from the search space"""
+    rng = rnd.Random(seed)
+    candidates = []
+    for _ in range(n):
+        params = {}
+        for name, (low, high) in space.items():
+            if isinstance(low, int) and isinstance(high, int):
+                params[name] = rng.randint(low, high)
+            else:
+                params[name] = round(rng.uniform(low, high), 3)
+        candidates.append(params)
+    return candidates
+
+
+def evaluate(job):
+    """
+    Run one candidate with one seed for a fixed number of generations (in a
+    worker process). Returns a result dict; "stats" is None if the run was
+    abandoned.
+    """
+    index, params, seed, generations, burn_in, max_density = job
+    alife.configure(**params)
+    rnd.seed(seed)
+    np.random.seed(seed)
+
+    field = alife.Field(fused=True, keep_history=False)
+    alife.populate(field)
+    cap = max_density * alife.ARRSIZE**2
+
+    result = {"index": index, "seed": seed, "generations": 0, "stats": None}
+    for g in range(1, generations + 1):
+        if g == burn_in + 1:
+            field.stats = PopulationStats()
+        field.generation()
+        rabbits, foxes = len(field.rabbits), len(field.foxes)
+        result["generations"] = g
+        if rabbits == 0 or foxes == 0:
+            result["reason"] = "rabbits extinct" if rabbits == 0 else "foxes extinct"
+            return result
+        # the start-up overshoot is part of the burn-in, so only cap after it
+        if g > burn_in and (rabbits > cap or foxes > cap):
+            result["reason"] = "population exceeded cap"
+            return result
+
+    result["stats"] = field.stats
+    result["reason"] = "survived"
+    return result
+
+
+def combine(index, params, runs):
+    """
+    One result per candidate from its runs over several seeds. The candidate
+    is abandoned if any seed was; otherwise the seeds' stats are merged and
+    scored together. "score" is None if the candidate was abandoned.
+    """
+    result = {"index": index, "params": params, "seeds": len(runs), "score": None}
+    failed = [r for r in runs if r["stats"] is None]
+    if failed:
+        first = min(failed, key=lambda r: r["generations"])
+        result["generations"] = first["generations"]
+        result["reason"] = f"{first['reason']} (seed {first['seed']})"
+        return result
+
+    summary = merge_all(r["stats"] for r in runs).summary()
+    r, f = summary["rabbits"], summary["foxes"]
+    result["generations"] = runs[0]["generations"]
+    result["score"] = max(r["std"] / r["mean"], f["std"] / f["mean"])
+    result["summary"] = summary
+    result["reason"] = "survived"
+    return result
+
+
+def successive_halving(
+    candidates,
+    min_generations=200,
+    max_generations=2000,
+    eta=3,
+    burn_in=0.2,
+    max_density=1.0,
+    seeds=3,
+    seed=0,
+    workers=None,
+):
+    """
+    Evaluate candidates with successive halving, each on `seeds` seeds.
+    Returns the results of the final rung, best (lowest score) first.
+    Each rung re-runs its survivors from generation 0 with the same seeds,
+    so a candidate's longer runs extend the exact trajectories of its short ones.
+    """
+    if not 0 <= burn_in < 1:
+        raise ValueError(f"burn_in must be in [0, 1), got {burn_in}")
+    if seeds < 1:
+        raise ValueError(f"seeds must be at least 1, got {seeds}")
+    rungs = [min_generations]
+    while rungs[-1] < max_generations:
+        rungs.append(min(rungs[-1] * eta, max_generations))
+
+    alive = list(enumerate(candidates))
+    results = []
+    with mp.Pool(workers) as pool:
+        for rung, generations in enumerate(rungs):
+            jobs = [
+                (
+                    i,
+                    params,
+                    seed + i * seeds + k,
+                    generations,
+                    int(generations * burn_in),
+                    max_density,
+                )
+                for i, params in alive
+                for k in range(seeds)
+            ]
+            runs = {i: [] for i, _ in alive}
+            for run in pool.imap_unordered(evaluate, jobs):
+                runs[run["index"]].append(run)
+            results = [combine(i, params, runs[i]) for i, params in alive]
+            survivors = sorted(
+                (r for r in results if r["score"] is not None), key=lambda r: r["score"]
+            )
+            print(
+                f"rung {rung}: {generations} generations x {seeds} seeds, "
+                f"{len(survivors)}/{len(results)} candidates stable"
+            )
+            if rung < len(rungs) - 1:
+                keep = max(1, len(survivors) // eta)
+                alive = [(r["index"], r["params"]) for r in survivors[:keep]]
+            if not alive or not survivors:
+                break
+
+    return sorted(
+        results, key=lambda r: (r["score"] is None, r["score"] or 0, -r["generations"])
+    )
+
+
+def format_settings(params):
+    """Print a parameter set like the Final Settings block in the written analysis"""
+    settings = {**alife.current_parameters(), **params}
+    return "\n".join(f"{name} = {value}" for name, value in settings.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--candidates", type=int, default=64)
+    parser.add_argument("--min-generations", type=int, default=200)
+    parser.add_argument("--max-generations", type=int, default=2000)
+    parser.add_argument("--eta", type=int, default=3, help="keep the best 1/eta per rung")
+    parser.add_argument(
+        "--burn-in", type=float, default=0.2, help="fraction of each run left out of the score"
+    )
+    parser.add_argument(
+        "--max-density", type=float, default=1.0, help="abandon above this many animals per cell"
+    )
+    parser.add_argument("--arrsize", type=int, default=alife.ARRSIZE)
+    parser.add_argument("--seeds", type=int, default=3, help="runs per candidate")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+    if not 0 <= args.burn_in < 1:
+        parser.error("--burn-in must be at least 0 and below 1")
+    if args.seeds < 1:
+        parser.error("--seeds must be at least 1")
+
+    candidates = sample_candidates(args.candidates, args.seed)
+    for params in candidates:
+        params["ARRSIZE"] = args.arrsize
+
+    results = successive_halving(
+        candidates,
+        min_generations=args.min_generations,
+        max_generations=args.max_generations,
+        eta=args.eta,
+        burn_in=args.burn_in,
+        max_density=args.max_density,
+        seeds=args.seeds,
+        seed=args.seed,
+        workers=args.workers,
+    )
+
+    print()
+    for rank, result in enumerate(results[: args.top], 1):
+        if result["score"] is None:
+            print(f"#{rank} abandoned after {result['generations']}: {result['reason']}")
+            continue
+        r, f = result["summary"]["rabbits"], result["summary"]["foxes"]
+        print(
+            f"#{rank} score {result['score']:.3f} | "
+            f"rabbits {r['mean']:.0f} +/- {r['std']:.0f} | "
+            f"foxes {f['mean']:.0f} +/- {f['std']:.0f}"
+        )
+        print(format_settings(result["params"]))
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Sampled lineage and trajectory recording for the foxes vs. rabbits model.
+
+A TrajectoryRecorder follows a sample of animals through a run. Founders
+(animals present when the recorder is attached, or added afterwards) are
+sampled by a hash of their id, and every descendant of a sampled animal is
+traced too, so whole lineages appear in the output. The run's random
+streams are not touched, so tracing does not change the simulation.
+
+One row is written per traced animal per generation, plus a row for each
+birth and death:
+
+    generation, id, parent, species, x, y, hunger, event
+
+Rows are buffered and appended in batches to a directory holding one raw
+file per column. load_trajectories() opens those files memory-mapped, so
+large traces can be analysed without reading them into memory.
+
+Animals need ids for this, so set alife.TRACK_IDS = True before creating them.
+"""
+
+import os
+
+import numpy as np
+
+COLUMNS = {
+    "generation": np.uint32,
+    "id": np.int64,
+    "parent": np.int64,  # -1 for founders
+    "species": np.uint8,
+    "x": np.int32,
+    "y": np.int32,
+    "hunger": np.int16,
+    "event": np.uint8,
+}
+
+SPECIES = {"rabbit": 0, "fox": 1}
+
+# event codes
+ALIVE = 0  # position at the end of a generation (or when tracing starts)
+BIRTH = 1
+STARVED = 2
+EATEN = 3
+EVENTS = {ALIVE: "alive", BIRTH: "birth", STARVED: "starved", EATEN: "eaten"}
+
+
+def _column_path(path, name):
+    return os.path.join(path, name + ".bin")
+
+
+class ColumnStore:
+    """Append-only columnar file set, written in batches through np.memmap"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.rows = None
+        for name, dtype in COLUMNS.items():
+            file = _column_path(path, name)
+            if not os.path.exists(file):
+                open(file, "wb").close()
+            rows = os.path.getsize(file) // np.dtype(dtype).itemsize
+            self.rows = rows if self.rows is None else min(self.rows, rows)
+
+    def append(self, batch):
+        """Append a dict of equal-length columns"""
+        n = len(batch["id"])
+        if n == 0:
+            return
+        for name, dtype in COLUMNS.items():
+            itemsize = np.dtype(dtype).itemsize
+            file = _column_path(self.path, name)
+            with open(file, "r+b") as f:
+                f.truncate((self.rows + n) * itemsize)
+            out = np.memmap(
+                file, dtype=dtype, mode="r+", offset=self.rows * itemsize, shape=(n,)
+            )
+            out[:] = batch[name]
+            out.flush()
+            del out
+        self.rows += n
+
+
+def load_trajectories(path):
+    """Read-only memory-mapped columns of a recorded trace"""
+    columns = {}
+    for name, dtype in COLUMNS.items():
+        file = _column_path(path, name)
+        if os.path.getsize(file) == 0:
+            columns[name] = np.empty(0, dtype=dtype)
+        else:
+            columns[name] = np.memmap(file, dtype=dtype, mode="r")
+    rows = min(len(c) for c in columns.values())
+    return {name: column[:rows] for name, column in columns.items()}
+
+
+class TrajectoryRecorder:
+    """
+    Follows sampled animals of a Field and writes their rows to a ColumnStore.
+    Attach with field.trace(recorder); call close() (or use it as a context
+    manager) when the run is over to write the last partial batch.
+    """
+
+    def __init__(self, path, sample_rate=0.01, batch_size=65536):
+        self.store = ColumnStore(path)
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.generation = 0
+        self.tracked = []  # (animal, species code) of live traced animals
+        self._buffer = {name: [] for name in COLUMNS}
+
+    def sampled(self, animal):
+        """
+        Deterministic id hash. Ids restart in alife.populate(), so a seeded
+        run samples the same founders every time.
+        """
+        if animal.id is None:
+            raise ValueError("trajectory recording needs alife.TRACK_IDS = True")
+        return (animal.id * 2654435761) % 2**32 < self.sample_rate * 2**32
+
+    def attach(self, field):
+        self.generation = field.generation_count
+        for species, animals in (("rabbit", field.rabbits), ("fox", field.foxes)):
+            for animal in animals:
+                self.consider(animal, species)
+
+    def consider(self, animal, species):
+        """Start tracing a founder if it falls in the sample"""
+        if self.sampled(animal):
+            animal.traced = True
+            self.tracked.append((animal, SPECIES[species]))
+            self._row(self.generation, animal, SPECIES[species], ALIVE)
+
+    def births(self, babies, species):
+        """Newborns of a traced parent (they inherit traced from the parent)"""
+        code = SPECIES[species]
+        born = self.generation + 1  # called while that generation is running
+        for baby in babies:
+            self.tracked.append((baby, code))
+            self._row(born, baby, code, BIRTH)
+
+    def record_generation(self, field):
+        """
+        End of a generation: one row per traced animal, dropping the dead.
+        Runs over the traced sample only, never the whole population.
+        """
+        generation = self.generation = field.generation_count
+        keep = 0
+        tracked = self.tracked
+        for i in range(len(tracked)):
+            animal, code = tracked[i]
+            if animal.alive:
+                self._row(generation, animal, code, ALIVE)
+                tracked[keep] = tracked[i]
+                keep += 1
+            elif animal.eaten:
+                self._row(generation, animal, code, EATEN)
+            else:
+                self._row(generation, animal, code, STARVED)
+        del tracked[keep:]
+
+        if len(self._buffer["id"]) >= self.batch_size:
+            self.flush()
+
+    def _row(self, generation, animal, species, event):
+        b = self._buffer
+        b["generation"].append(generation)
+        b["id"].append(animal.id)
+        b["parent"].append(-1 if animal.parent_id is None else animal.parent_id)
+        b["species"].append(species)
+        b["x"].append(animal.x)
+        b["y"].append(animal.y)
+        b["hunger"].append(animal.hunger)
+        b["event"].append(event)
+
+    def flush(self):
+        batch = {
+            name: np.asarray(values, dtype=COLUMNS[name])
+            for name, values in self._buffer.items()
+        }
+        self.store.append(batch)
+        self._buffer = {name: [] for name in COLUMNS}
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
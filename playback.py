@@ -0,0 +1,339 @@
+"""
+Keyframe recording and seekable playback for the foxes vs. rabbits model.
+
+While a run is recorded, a compact keyframe (grass, animals and the state of
+every random number source) is stored every `every` generations, together
+with the population counts of every generation. Playback jumps to any
+generation by restoring the nearest earlier keyframe and re-simulating at
+most `every` - 1 generations, which gives exactly the recorded run.
+
+Usage:
+    python playback.py record --generations 5000 --every 250 --out run.kf
+    python playback.py view run.kf --generation 4213
+
+In the viewer, drag the slider or use left/right (one generation),
+down/up (one keyframe interval) and space (play / pause).
+"""
+
+import argparse
+import bisect
+import itertools
+import pickle
+import random as rnd
+import zlib
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.widgets import Slider
+
+import alife
+from rng_stream import RandomStream
+
+# =========== Keyframes ============
+
+
+def _next_id():
+    """Next animal id, without using it up"""
+    n = next(alife._animal_ids)
+    alife._animal_ids = itertools.count(n)
+    return n
+
+
+def _pack_animals(animals):
+    n = len(animals)
+    return {
+        "x": np.fromiter((a.x for a in animals), np.int32, n),
+        "y": np.fromiter((a.y for a in animals), np.int32, n),
+        "hunger": np.fromiter((a.hunger for a in animals), np.int32, n),
+        "id": np.fromiter((-1 if a.id is None else a.id for a in animals), np.int64, n),
+        "parent": np.fromiter(
+            (-1 if a.parent_id is None else a.parent_id for a in animals), np.int64, n
+        ),
+    }
+
+
+def _unpack_animals(packed):
+    animals = []
+    columns = [packed[name].tolist() for name in ("x", "y", "hunger", "id", "parent")]
+    for x, y, hunger, id_, parent in zip(*columns):
+        animal = object.__new__(alife.Animal)  # skip __init__, it draws a position
+        animal.max_offspring = alife.OFFSPRING
+        animal.starvation_level = alife.STARVATION_LEVEL
+        animal.reproduction_level = alife.REPRODUCTION_LEVEL
+        animal.hunger = hunger
+        animal.alive = True
+        animal.eaten = False
+        animal.x = x
+        animal.y = y
+        animal.id = None if id_ < 0 else id_
+        animal.parent_id = None if parent < 0 else parent
+        animal.traced = False
+        animals.append(animal)
+    return animals
+
+
+def encode_keyframe(field):
+    """Compressed snapshot of everything the next generations depend on"""
+    if field.chunked:
+        grass = {
+            "tiles": {key: tile.copy() for key, tile in field.field.tiles.items()},
+            "clock": field.field.clock,
+        }
+    else:
+        grass = np.packbits(field.field != 0)
+    state = {
+        "generation": field.generation_count,
+        "grass": grass,
+        "rabbits": _pack_animals(field.rabbits),
+        "foxes": _pack_animals(field.foxes),
+        "random": rnd.getstate(),
+        "np_random": np.random.get_state(),
+        "stream": field.rng.checkpoint() if field.rng is not None else None,
+        "next_id": _next_id(),
+    }
+    return zlib.compress(pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+
+
+def decode_keyframe(blob, options):
+    """Rebuild the Field of a keyframe and put the random sources back"""
+    state = pickle.loads(zlib.decompress(blob))
+    rng = None
+    if options["stream"] is not None:
+        rng = RandomStream(**options["stream"], checkpoint=state["stream"])
+    field = alife.Field(
+        fused=options["fused"], chunked=options["chunked"], keep_history=False, rng=rng
+    )
+    if field.chunked:
+        field.field.tiles = state["grass"]["tiles"]
+        field.field.clock = state["grass"]["clock"]
+    else:
+        bits = np.unpackbits(state["grass"], count=alife.ARRSIZE**2)
+        field.field = bits.reshape(alife.ARRSIZE, alife.ARRSIZE).astype(float)
+    field.rabbits = _unpack_animals(state["rabbits"])
+    field.foxes = _unpack_animals(state["foxes"])
+    field.generation_count = state["generation"]
+
+    rnd.setstate(state["random"])
+    np.random.set_state(state["np_random"])
+    alife._animal_ids = itertools.count(state["next_id"])
+    return field
+
+
+class KeyframeRecorder:
+    """
+    Stores a keyframe every `every` generations plus the population counts.
+    attach(field) after populating the field; save() writes the recording.
+    """
+
+    def __init__(self, every=500):
+        self.every = every
+        self.keyframes = {}  # generation -> compressed keyframe
+        self.rabbit_history = []
+        self.fox_history = []
+        self.params = None
+        self.options = None
+
+    def attach(self, field):
+        if field.generation_count != 0:
+            raise ValueError("attach the recorder before the first generation")
+        stream = None
+        if field.rng is not None:
+            stream = {
+                "seed": field.rng.seed,
+                "size": field.rng.size,
+                "grass_rate": field.rng.grass_rate,
+                "depth": field.rng.depth,
+            }
+        self.params = alife.current_parameters()
+        self.options = {
+            "fused": field.fused,
+            "chunked": field.chunked,
+            "track_ids": alife.TRACK_IDS,
+            "stream": stream,
+        }
+        field.keyframes = self
+        self.update(field)
+
+    def update(self, field):
+        self.rabbit_history.append(len(field.rabbits))
+        self.fox_history.append(len(field.foxes))
+        if field.generation_count % self.every == 0:
+            self.keyframes[field.generation_count] = encode_keyframe(field)
+
+    def recording(self):
+        return {
+            "every": self.every,
+            "params": self.params,
+            "options": self.options,
+            "keyframes": self.keyframes,
+            "rabbit_history": np.asarray(self.rabbit_history, dtype=np.int64),
+            "fox_history": np.asarray(self.fox_history, dtype=np.int64),
+        }
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self.recording(), f, pickle.HIGHEST_PROTOCOL)
+
+
+def load_recording(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+# =========== Playback ============
+
+
+class Playback:
+    """Random access to the generations of a recording"""
+
+    def __init__(self, recording):
+        self.recording = recording
+        self.every = recording["every"]
+        self.starts = sorted(recording["keyframes"])
+        self.last = len(recording["rabbit_history"]) - 1
+        self.field = None
+        alife.configure(**recording["params"])
+        alife.TRACK_IDS = recording["options"]["track_ids"]
+
+    def _restore(self, generation):
+        if self.field is not None and self.field.rng is not None:
+            self.field.rng.close()
+        blob = self.recording["keyframes"][generation]
+        self.field = decode_keyframe(blob, self.recording["options"])
+
+    def seek(self, generation):
+        """The Field as it was at the end of `generation`"""
+        if not 0 <= generation <= self.last:
+            raise ValueError(f"generation must be between 0 and {self.last}")
+        start = self.starts[bisect.bisect_right(self.starts, generation) - 1]
+        current = None if self.field is None else self.field.generation_count
+        if current is None or not start <= current <= generation:
+            self._restore(start)
+        while self.field.generation_count < generation:
+            self.field.generation()
+        return self.field
+
+
+def view(playback, generation=0):
+    """Animation window with a generation slider"""
+    recording = playback.recording
+
+    fig = plt.figure(figsize=(alife.FIGSIZE * 2, alife.FIGSIZE))
+    ax_main = plt.subplot(1, 2, 1)
+    ax_time = plt.subplot(1, 2, 2)
+    fig.subplots_adjust(bottom=0.15)
+    ax_slider = fig.add_axes([0.15, 0.04, 0.7, 0.03])
+
+    cmap = plt.cm.colors.ListedColormap(alife.COLORS)
+    img = ax_main.imshow(
+        np.zeros((1, 1)), cmap=cmap, vmin=0, vmax=3, interpolation="hamming"
+    )
+    lod = alife.LevelOfDetail(ax_main, img)
+
+    ax_time.set_xlabel("Generation")
+    ax_time.set_ylabel("Population")
+    ax_time.set_title("Population Over Time")
+    ax_time.grid(True, alpha=0.3)
+    ax_time.plot(recording["rabbit_history"], "blue", linewidth=2, label="Rabbits")
+    ax_time.plot(recording["fox_history"], "red", linewidth=2, label="Foxes")
+    ax_time.legend(loc="upper right")
+    marker = ax_time.axvline(generation, color="black", linewidth=1)
+
+    slider = Slider(
+        ax_slider, "Generation", 0, playback.last, valinit=generation, valstep=1
+    )
+
+    def show(value):
+        g = int(value)
+        field = playback.seek(g)
+        lod.render(field)
+        ax_main.set_title(
+            f"Generation {g} | Rabbits: {len(field.rabbits)} Foxes: {len(field.foxes)}"
+        )
+        marker.set_xdata([g, g])
+        fig.canvas.draw_idle()
+
+    def advance():
+        if slider.val < playback.last:
+            slider.set_val(slider.val + 1)
+
+    timer = fig.canvas.new_timer(interval=200)
+    timer.add_callback(advance)
+    playing = [False]
+
+    def on_key(event):
+        steps = {"right": 1, "left": -1, "up": playback.every, "down": -playback.every}
+        if event.key in steps:
+            slider.set_val(min(max(slider.val + steps[event.key], 0), playback.last))
+        elif event.key == " ":
+            playing[0] = not playing[0]
+            timer.start() if playing[0] else timer.stop()
+
+    slider.on_changed(show)
+    fig.canvas.mpl_connect("key_press_event", on_key)
+    show(generation)
+    plt.show()
+
+
+# =========== Command line ============
+
+
+def record(generations, every, out, seed=None, fused=alife.FUSED, chunked=False, stream=False):
+    """Run a simulation without a window and save its keyframes"""
+    rnd.seed(seed)
+    np.random.seed(seed)
+    rng = None
+    if stream:
+        size = None if chunked else alife.ARRSIZE
+        rng = RandomStream(seed, size, alife.GRASS_RATE)
+    field = alife.Field(fused=fused, chunked=chunked, keep_history=False, rng=rng)
+    alife.populate(field)
+
+    recorder = KeyframeRecorder(every)
+    recorder.attach(field)
+    for _ in range(generations):
+        field.generation()
+        if not field.rabbits and not field.foxes:
+            break
+    recorder.save(out)
+    if rng is not None:
+        rng.close()
+    return recorder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="run headless and store keyframes")
+    rec.add_argument("--generations", type=int, default=1000)
+    rec.add_argument("--every", type=int, default=100, help="keyframe interval K")
+    rec.add_argument("--out", default="run.kf")
+    rec.add_argument("--seed", type=int, default=None)
+    rec.add_argument("--chunked", action="store_true")
+    rec.add_argument("--stream", action="store_true", help="use the prefetched RandomStream")
+
+    viewer = commands.add_parser("view", help="open a recording in the playback viewer")
+    viewer.add_argument("path")
+    viewer.add_argument("--generation", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "record":
+        recorder = record(
+            args.generations,
+            args.every,
+            args.out,
+            seed=args.seed,
+            chunked=args.chunked,
+            stream=args.stream,
+        )
+        print(
+            f"recorded {len(recorder.rabbit_history) - 1} generations, "
+            f"{len(recorder.keyframes)} keyframes -> {args.out}"
+        )
+    else:
+        view(Playback(load_recording(args.path)), args.generation)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Off-screen rendering of the figures for the written analysis.
+
+Takes a recording made with `playback.py record` (keyframes plus the
+population history) and renders, with the Agg backend and no display:
+
+    timeseries.png        population over time
+    panels/*.png          one landscape panel per requested generation
+    landscape.png         all panels on one figure
+    frames/*.png          optional movie frames (--movie)
+
+Every panel, frame and plot is a separate job for a process pool. Each
+worker keeps its own Playback, and jobs are handed out in generation order,
+so a worker mostly steps forward from its previous state instead of
+restoring a keyframe for every image.
+
+Usage:
+    python report.py run.kf --out report --panel-every 500 --movie --frame-step 5
+"""
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import argparse
+import math
+import multiprocessing as mp
+import os
+
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+import alife
+from playback import Playback, load_recording
+
+PANEL_SIZE = 4  # inches
+DPI = 100
+
+_playback = None  # per worker process
+
+
+def _init_worker(path):
+    global _playback
+    _playback = Playback(load_recording(path))
+
+
+def _landscape(ax, field):
+    cmap = plt.cm.colors.ListedColormap(alife.COLORS)
+    size = alife.ARRSIZE
+    pixels = PANEL_SIZE * DPI  # no point drawing more cells than the panel has pixels
+    display = alife.compose_reduced(field, 0, size, 0, size, pixels, pixels)
+    ax.imshow(display, cmap=cmap, vmin=0, vmax=3, interpolation="hamming")
+    ax.set_title(
+        f"Generation {field.generation_count} | "
+        f"Rabbits: {len(field.rabbits)} Foxes: {len(field.foxes)}",
+        fontsize=9,
+    )
+    ax.set_xticks([])
+    ax.set_yticks([])
+
+
+def render_job(job):
+    """Render one image; runs in a worker. job = (kind, generation, path)"""
+    kind, generation, path = job
+    if kind == "timeseries":
+        recording = _playback.recording
+        fig = Figure(figsize=(alife.FIGSIZE, alife.FIGSIZE * 0.6))
+        ax = fig.add_subplot()
+        ax.plot(recording["rabbit_history"], "blue", linewidth=2, label="Rabbits")
+        ax.plot(recording["fox_history"], "red", linewidth=2, label="Foxes")
+        ax.set_xlabel("Generation")
+        ax.set_ylabel("Population")
+        ax.set_title("Population Over Time")
+        ax.grid(True, alpha=0.3)
+        ax.legend(loc="upper right")
+    else:
+        field = _playback.seek(generation)
+        fig = Figure(figsize=(PANEL_SIZE, PANEL_SIZE))
+        _landscape(fig.add_subplot(), field)
+    fig.tight_layout()
+    fig.savefig(path, dpi=DPI)
+    return path
+
+
+def montage(paths, out, columns=5):
+    """Put the rendered panels on one figure"""
+    rows = math.ceil(len(paths) / columns)
+    fig = Figure(figsize=(PANEL_SIZE * columns, PANEL_SIZE * rows))
+    for i, path in enumerate(paths):
+        ax = fig.add_subplot(rows, columns, i + 1)
+        ax.imshow(plt.imread(path))
+        ax.axis("off")
+    fig.tight_layout()
+    fig.savefig(out, dpi=DPI)
+
+
+def build_report(path, out, panels=(), frames=(), columns=5, workers=None):
+    """Render the report for the recording at `path` into directory `out`"""
+    os.makedirs(os.path.join(out, "panels"), exist_ok=True)
+    if frames:
+        os.makedirs(os.path.join(out, "frames"), exist_ok=True)
+
+    panel_jobs = [
+        ("panel", g, os.path.join(out, "panels", f"panel_{g:07d}.png")) for g in panels
+    ]
+    frame_jobs = [
+        ("frame", g, os.path.join(out, "frames", f"frame_{i:06d}.png"))
+        for i, g in enumerate(frames)
+    ]
+    # sorted by generation so each worker mostly seeks forward
+    jobs = sorted(panel_jobs + frame_jobs, key=lambda job: job[1])
+    jobs.insert(0, ("timeseries", 0, os.path.join(out, "timeseries.png")))
+
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with mp.Pool(workers, initializer=_init_worker, initargs=(path,)) as pool:
+        for done, _ in enumerate(pool.imap_unordered(render_job, jobs, chunksize), 1):
+            if done % 100 == 0 or done == len(jobs):
+                print(f"{done}/{len(jobs)} images")
+
+    if panel_jobs:
+        montage([job[2] for job in panel_jobs], os.path.join(out, "landscape.png"), columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("recording", help="file written by playback.py record")
+    parser.add_argument("--out", default="report")
+    parser.add_argument("--panels", type=int, nargs="*", default=[], help="generations")
+    parser.add_argument("--panel-every", type=int, default=None)
+    parser.add_argument("--columns", type=int, default=5)
+    parser.add_argument("--movie", action="store_true", help="also render movie frames")
+    parser.add_argument("--frame-step", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    last = len(load_recording(args.recording)["rabbit_history"]) - 1
+    panels = sorted(g for g in args.panels if 0 <= g <= last)
+    if args.panel_every:
+        panels = sorted(set(panels) | set(range(0, last + 1, args.panel_every)))
+    frames = range(0, last + 1, args.frame_step) if args.movie else ()
+
+    build_report(args.recording, args.out, panels, frames, args.columns, args.workers)
+    if frames:
+        print(
+            "assemble the movie with: ffmpeg -framerate 10 -i "
+            f"{os.path.join(args.out, 'frames', 'frame_%06d.png')} movie.mp4"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Background random number prefetching for the foxes vs. rabbits model.
+
+A RandomStream owns NumPy generators and, on background threads, fills
+reusable buffers with the random numbers the next generation will need:
+uniform floats for movement, litter sizes and lazy regrowth, and a whole
+regrowth mask for the dense grass field. NumPy releases the GIL while it
+fills large buffers, so drawing overlaps with the Python work of the step.
+
+Each buffer is filled from one generator in a fixed order, so the values
+handed out depend only on the seed, never on thread timing.
+"""
+
+import queue
+import threading
+
+import numpy as np
+
+CHUNK = 1 << 16  # floats per prefetched uniform buffer
+
+
+class _Prefetcher:
+    """One generator and a thread filling a small ring of reusable buffers"""
+
+    def __init__(self, seed_seq, shape, fill, depth=2, dtype=float, state=None):
+        self.gen = np.random.Generator(np.random.PCG64(seed_seq))
+        if state is not None:
+            self.gen.bit_generator.state = state
+        self.fill = fill
+        self.free = queue.Queue()
+        self.full = queue.Queue()
+        for _ in range(depth):
+            self.free.put(np.empty(shape, dtype=dtype))
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            buf = self.free.get()
+            if buf is None:
+                return
+            state = self.gen.bit_generator.state  # generator state before this buffer
+            try:
+                self.fill(self.gen, buf)
+            except Exception as e:
+                self.full.put(e)  # raised by take() instead of leaving it waiting
+                return
+            self.full.put((buf, state))
+
+    def take(self):
+        """Next filled buffer and the generator state it was drawn from"""
+        item = self.full.get()
+        if isinstance(item, Exception):
+            self.full.put(item)  # every later take() fails the same way
+            raise item
+        return item
+
+    def give_back(self, buf):
+        self.free.put(buf)
+
+    def close(self):
+        self.free.put(None)
+
+
+def _fill_uniform(gen, buf):
+    gen.random(out=buf)
+
+
+class RandomStream:
+    """
+    Seeded source of the per-generation randomness of a Field.
+
+    uniform(n) hands out the next n floats of an endless uniform stream.
+    grass_mask() returns the regrowth mask for one dense generation (pass
+    size=None for a chunked field, which needs no mask).
+    Arrays returned are reused by the stream: consume them before the
+    next call.
+    """
+
+    def __init__(self, seed=None, size=None, grass_rate=None, depth=2, checkpoint=None):
+        seed_seq = np.random.SeedSequence(seed)
+        self.seed = seed_seq.entropy  # drawn from the OS when seed is None
+        self.size = size
+        self.grass_rate = grass_rate
+        self.depth = depth
+        if size is not None and grass_rate is None:
+            raise ValueError("a grass mask (size) needs a grass_rate")
+        uniform_seq, grass_seq = seed_seq.spawn(2)
+        cp = checkpoint or {}
+        self._uniform = _Prefetcher(
+            uniform_seq, CHUNK, _fill_uniform, depth, state=cp.get("uniform_state")
+        )
+        self._chunk, self._chunk_state = self._uniform.take()
+        self._pos = cp.get("uniform_pos", 0)
+        self._scratch = np.empty(CHUNK)
+
+        self._grass = None
+        self._mask = None
+        self._mask_state = None
+        if size is not None:
+            # drawn in float32 row bands, so the scratch stays small on huge fields
+            band = max(1, CHUNK // size)
+            scratch = np.empty((band, size), dtype=np.float32)
+
+            def fill_mask(gen, buf):
+                for r0 in range(0, size, band):
+                    rows = scratch[: min(band, size - r0)]
+                    gen.random(dtype=np.float32, out=rows)
+                    np.less(rows, grass_rate, out=buf[r0 : r0 + len(rows)])
+
+            self._grass = _Prefetcher(
+                grass_seq, (size, size), fill_mask, depth, bool, cp.get("grass_state")
+            )
+            if cp.get("grass_used"):
+                self._mask, self._mask_state = self._grass.take()
+
+    def uniform(self, n):
+        """Next n floats in [0, 1)"""
+        if len(self._scratch) < n:
+            self._scratch = np.empty(max(n, 2 * len(self._scratch)))
+        out = self._scratch[:n]
+        filled = 0
+        while filled < n:
+            if self._pos == len(self._chunk):
+                self._uniform.give_back(self._chunk)
+                self._chunk, self._chunk_state = self._uniform.take()
+                self._pos = 0
+            k = min(n - filled, len(self._chunk) - self._pos)
+            out[filled : filled + k] = self._chunk[self._pos : self._pos + k]
+            filled += k
+            self._pos += k
+        return out
+
+    def random(self):
+        """Next single float in [0, 1)"""
+        if self._pos == len(self._chunk):
+            self._uniform.give_back(self._chunk)
+            self._chunk, self._chunk_state = self._uniform.take()
+            self._pos = 0
+        self._pos += 1
+        return float(self._chunk[self._pos - 1])
+
+    def steps(self, n):
+        """n (dx, dy) moves in {-1, 0, 1}, shape (n, 2)"""
+        u = self.uniform(2 * n)
+        return (u * 3).astype(np.int64).reshape(n, 2) - 1
+
+    def grass_mask(self):
+        """Regrowth mask for one generation of the dense field"""
+        if self._mask is not None:
+            self._grass.give_back(self._mask)
+        self._mask, self._mask_state = self._grass.take()
+        return self._mask
+
+    def checkpoint(self):
+        """
+        Position of the stream, small enough to store with a keyframe.
+        RandomStream(..., checkpoint=cp) continues with exactly the numbers
+        this stream would hand out next.
+        """
+        return {
+            "uniform_state": self._chunk_state,
+            "uniform_pos": self._pos,
+            "grass_state": self._mask_state,
+            "grass_used": self._mask is not None,
+        }
+
+    def close(self):
+        self._uniform.close()
+        if self._grass is not None:
+            self._grass.close()
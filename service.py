@@ -0,0 +1,360 @@
+"""
+Long-lived local job service for many short simulations.
+
+`serve` starts a pool of worker processes that import NumPy, matplotlib and
+the model once and keep a preallocated Field between jobs, then listens on
+a Unix socket. Clients send simulation specs as JSON lines; every spec is
+queued, the queue is served shortest-expected-job first, and status
+messages and results are streamed back on the same connection as JSON
+lines tagged with the job id.
+
+A spec looks like:
+
+    {"id": "a", "params": {"GRASS_RATE": 0.1}, "seed": 3, "generations": 500,
+     "outputs": ["history", "stats", "final"], "spatial_resolution": 10}
+
+outputs may contain "history" (population per generation), "stats"
+(streaming summary), "final" (last counts) and "spatial" (block metrics,
+needs spatial_resolution). Parameters not given keep their defaults.
+
+Usage:
+    python service.py serve --socket /tmp/alife.sock --workers 8
+    python service.py submit specs.jsonl --socket /tmp/alife.sock
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import os
+import queue
+import random as rnd
+import socket
+import socketserver
+import threading
+
+import numpy as np
+
+import alife
+
+SOCKET = "/tmp/alife.sock"
+OUTPUTS = ("history", "stats", "final", "spatial")
+DEFAULT_OUTPUTS = ("final", "stats")
+
+# (type, lowest, highest) accepted for each model parameter; None = no limit
+PARAMETER_RANGES = {
+    "ARRSIZE": (int, 1, 10000),  # the dense field is ARRSIZE**2 floats per worker
+    "INIT_RABBITS": (int, 0, None),
+    "INIT_FOXES": (int, 0, None),
+    "GRASS_RATE": (float, 0, 1),
+    "OFFSPRING": (int, 1, None),
+    "STARVATION_LEVEL": (int, 1, None),
+    "REPRODUCTION_LEVEL": (int, 0, None),
+}
+
+
+def check_spec(spec):
+    """Raise ValueError for a spec a worker could not run"""
+    params = spec.get("params", {})
+    if not isinstance(params, dict):
+        raise ValueError("params must be an object")
+    for name, value in params.items():
+        if name not in PARAMETER_RANGES:
+            raise ValueError(f"unknown parameter {name!r}")
+        kind, low, high = PARAMETER_RANGES[name]
+        if kind is float:
+            types, what = (int, float), "a number"
+        else:
+            types, what = (int,), "an integer"
+        if isinstance(value, bool) or not isinstance(value, types):
+            raise ValueError(f"parameter {name} must be {what}")
+        if value < low or (high is not None and value > high):
+            limit = f"between {low} and {high}" if high is not None else f"at least {low}"
+            raise ValueError(f"parameter {name} must be {limit}")
+    generations = spec.get("generations", 100)
+    if isinstance(generations, bool) or not isinstance(generations, int) or generations < 0:
+        raise ValueError("generations must be a non-negative integer")
+    seed = spec.get("seed")
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int) or seed < 0):
+        raise ValueError("seed must be a non-negative integer")
+    outputs = spec.get("outputs", DEFAULT_OUTPUTS)
+    if not isinstance(outputs, (list, tuple)) or not set(outputs) <= set(OUTPUTS):
+        raise ValueError(f"outputs must be a list drawn from {list(OUTPUTS)}")
+    if "spatial" in outputs:
+        size = params.get("ARRSIZE", alife.ARRSIZE)
+        resolution = spec.get("spatial_resolution")
+        if isinstance(resolution, bool) or not isinstance(resolution, int):
+            raise ValueError('"spatial" needs an integer spatial_resolution')
+        if not 1 <= resolution <= size:
+            raise ValueError(f"spatial_resolution must be between 1 and {size}")
+
+
+def expected_cost(spec):
+    """
+    Rough work estimate used to order the queue: generations times the
+    starting population plus the grass updated every generation.
+    """
+    params = {**alife.current_parameters(), **spec.get("params", {})}
+    animals = params["INIT_RABBITS"] + params["INIT_FOXES"]
+    cells = params["ARRSIZE"] ** 2
+    return spec.get("generations", 100) * (animals + cells / 100)
+
+
+# =========== Worker Section ============
+
+
+def run_spec(field, defaults, spec):
+    """Run one spec on a reused Field and build its result"""
+    alife.configure(**{**defaults, **spec.get("params", {})})
+    seed = spec.get("seed")
+    rnd.seed(seed)
+    np.random.seed(seed)
+
+    outputs = spec.get("outputs", DEFAULT_OUTPUTS)
+    field.keep_history = "history" in outputs
+    field.reset(
+        stats="stats" in outputs,
+        spatial_resolution=spec.get("spatial_resolution") if "spatial" in outputs else None,
+    )
+    alife.populate(field)
+
+    for _ in range(spec.get("generations", 100)):
+        if not field.rabbits and not field.foxes:
+            break
+        field.generation()
+
+    result = {"generations": field.generation_count}
+    if "final" in outputs:
+        result["rabbits"] = len(field.rabbits)
+        result["foxes"] = len(field.foxes)
+    if "history" in outputs:
+        result["rabbit_history"] = list(field.rabbit_history)
+        result["fox_history"] = list(field.fox_history)
+    if "stats" in outputs:
+        result["stats"] = field.stats.summary()
+    if field.spatial is not None:
+        result["spatial"] = {
+            name: values.tolist() for name, values in field.spatial.arrays().items()
+        }
+    return result
+
+
+def worker_main(conn):
+    """Worker process: warm imports and one Field, reused for every job"""
+    defaults = alife.current_parameters()
+    field = alife.Field(fused=True)
+    while True:
+        spec = conn.recv()
+        if spec is None:
+            return
+        try:
+            conn.send({"status": "done", "result": run_spec(field, defaults, spec)})
+        except Exception as e:
+            conn.send({"status": "error", "error": f"{type(e).__name__}: {e}"})
+            alife.configure(**defaults)  # the failed spec's settings may be unusable
+            field = alife.Field(fused=True)
+
+
+class Worker:
+    """A worker process and the pipe to it, restarted if it dies"""
+
+    def __init__(self, index):
+        self.index = index
+        self.start()
+
+    def start(self):
+        self.conn, child = mp.Pipe()
+        self.process = mp.Process(target=worker_main, args=(child,), daemon=True)
+        self.process.start()
+
+    def run(self, spec, retries=1):
+        """
+        Run a spec and return the worker's reply. If the worker has died, it
+        is restarted and the spec resubmitted, up to `retries` times (a spec
+        that kills every worker it is given still fails in the end).
+        """
+        try:
+            self.conn.send(spec)
+            return self.conn.recv()
+        except (EOFError, OSError):
+            self.process.join(timeout=1)
+            self.start()
+            if retries:
+                return self.run(spec, retries - 1)
+            return {"status": "error", "error": "worker died"}
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+
+
+# =========== Scheduler Section ============
+
+
+class Scheduler:
+    """Priority queue of jobs (shortest expected first) served by the workers"""
+
+    def __init__(self, workers):
+        self.jobs = queue.PriorityQueue()
+        self.order = itertools.count()  # ties are served first come, first served
+        self.workers = [Worker(i) for i in range(workers)]
+        self.threads = [
+            threading.Thread(target=self._dispatch, args=(w,), daemon=True)
+            for w in self.workers
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, spec, reply):
+        """
+        Check and queue a spec; reply(message) is called with every status
+        update and must not block (it runs on the dispatcher threads).
+        Raises ValueError for an invalid spec, which is then not queued.
+        """
+        check_spec(spec)
+        cost = expected_cost(spec)
+        reply({"id": spec.get("id"), "status": "queued", "waiting": self.jobs.qsize() + 1})
+        self.jobs.put((cost, next(self.order), spec, reply))
+
+    def _dispatch(self, worker):
+        while True:
+            _, _, spec, reply = self.jobs.get()
+            if spec is None:
+                return
+            reply({"id": spec.get("id"), "status": "running", "worker": worker.index})
+            reply({"id": spec.get("id"), **worker.run(spec)})
+
+    def close(self):
+        for _ in self.threads:
+            self.jobs.put((float("inf"), next(self.order), None, None))
+        for thread in self.threads:
+            thread.join()
+        for worker in self.workers:
+            worker.stop()
+
+
+# =========== Socket Section ============
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    """
+    One client connection: read specs until EOF, stream back all replies.
+    Replies go through a per-connection outbox that only this handler
+    thread writes to the socket, so a client that stops reading holds up
+    its own connection and never a dispatcher thread.
+    """
+
+    def handle(self):
+        outbox = queue.Queue()
+        reader = threading.Thread(target=self.read_specs, args=(outbox,), daemon=True)
+        reader.start()
+
+        expected = None  # replies that end a job, known once the reader is done
+        finished = 0
+        connected = True
+        while expected is None or finished < expected:
+            message = outbox.get()
+            if isinstance(message, int):  # the reader is done, `message` specs read
+                expected = message
+                continue
+            if message["status"] in ("done", "error"):
+                finished += 1
+            if connected:
+                try:
+                    self.wfile.write((json.dumps(message) + "\n").encode())
+                    self.wfile.flush()
+                except OSError:
+                    connected = False  # client went away, the jobs still complete
+
+    def read_specs(self, outbox):
+        """Submit every spec line; each one ends with exactly one done/error reply"""
+        specs = 0
+        try:
+            for n, line in enumerate(self.rfile):
+                if not line.strip():
+                    continue
+                specs += 1
+                spec = None
+                try:
+                    spec = json.loads(line)
+                    if not isinstance(spec, dict):
+                        raise ValueError("a spec must be a JSON object")
+                    spec.setdefault("id", n)
+                    self.server.scheduler.submit(spec, outbox.put)
+                except (ValueError, TypeError, KeyError) as e:
+                    job_id = spec.get("id") if isinstance(spec, dict) else None
+                    outbox.put({"id": job_id, "status": "error", "error": f"bad spec: {e}"})
+        except OSError:
+            pass  # connection reset while reading, answer what was submitted
+        finally:
+            outbox.put(specs)
+
+
+class JobServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, workers):
+        if os.path.exists(path):
+            os.unlink(path)
+        self.scheduler = Scheduler(workers)
+        super().__init__(path, JobHandler)
+
+
+def serve(path=SOCKET, workers=None):
+    server = JobServer(path, workers or os.cpu_count())
+    print(f"serving on {path} with {len(server.scheduler.workers)} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.scheduler.close()
+        os.unlink(path)
+
+
+def submit(specs, path=SOCKET):
+    """Send specs to a running service and yield its replies as they arrive"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall("".join(json.dumps(spec) + "\n" for spec in specs).encode())
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile("r") as replies:
+            for line in replies:
+                yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    srv = commands.add_parser("serve", help="start the worker pool and listen")
+    srv.add_argument("--socket", default=SOCKET)
+    srv.add_argument("--workers", type=int, default=os.cpu_count())
+
+    sub = commands.add_parser("submit", help="send a file of JSON-line specs")
+    sub.add_argument("specs", help="file with one JSON spec per line, - for stdin")
+    sub.add_argument("--socket", default=SOCKET)
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        serve(args.socket, args.workers)
+    else:
+        specs = []
+        with open(0 if args.specs == "-" else args.specs) as f:
+            for n, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    specs.append(json.loads(line))
+                except ValueError as e:
+                    parser.error(f"{args.specs} line {n} is not valid JSON: {e}")
+        for reply in submit(specs, args.socket):
+            print(json.dumps(reply))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Coarse-grained spatial metrics for the foxes vs. rabbits model.
+
+Each generation the field is reduced to a resolution x resolution grid of
+blocks and only these small arrays (plus a few scalar indices) are kept, so
+the landscape of a very large world can be studied without saving frames.
+
+Blocks follow the grass array layout: block row comes from x, block column
+from y (the same field[x, y] indexing the animals use when they eat).
+"""
+
+import numpy as np
+
+
+def block_edges(size, resolution):
+    """Start index of each of `resolution` (nearly) equal blocks along an axis"""
+    if not 1 <= resolution <= size:
+        # more blocks than cells would give empty blocks (repeated edges)
+        raise ValueError(f"resolution must be between 1 and {size}, got {resolution}")
+    return (np.arange(resolution) * size) // resolution
+
+
+def block_mean(grid, resolution):
+    """Mean of a 2D array over resolution x resolution blocks"""
+    rows = block_edges(grid.shape[0], resolution)
+    cols = block_edges(grid.shape[1], resolution)
+    sums = np.add.reduceat(np.add.reduceat(grid, rows, axis=0), cols, axis=1)
+    heights = np.diff(np.append(rows, grid.shape[0]))
+    widths = np.diff(np.append(cols, grid.shape[1]))
+    return sums / np.outer(heights, widths)
+
+
+def block_counts(animals, size, resolution):
+    """Number of animals in each block (the same blocks as block_mean)"""
+    n = len(animals)
+    x = np.fromiter((a.x for a in animals), dtype=np.int64, count=n)
+    y = np.fromiter((a.y for a in animals), dtype=np.int64, count=n)
+    edges = block_edges(size, resolution)
+    bx = np.searchsorted(edges, x, side="right") - 1
+    by = np.searchsorted(edges, y, side="right") - 1
+    idx = bx * resolution + by
+    counts = np.bincount(idx, minlength=resolution * resolution)
+    return counts.reshape(resolution, resolution)
+
+
+def morisita(counts):
+    """
+    Morisita index of dispersion over blocks.
+    1 = randomly scattered, > 1 = clustered, < 1 = evenly spread.
+    """
+    total = counts.sum()
+    if total < 2:
+        return np.nan
+    counts = counts.astype(np.float64)
+    return counts.size * (counts * (counts - 1)).sum() / (total * (total - 1))
+
+
+def colocation(rabbits, foxes):
+    """
+    Morisita-style overlap of foxes with rabbits over blocks.
+    1 = foxes placed independently of rabbits, > 1 = foxes sit where the
+    rabbits are, < 1 = foxes avoid rabbit blocks.
+    """
+    r_total = rabbits.sum()
+    f_total = foxes.sum()
+    if r_total == 0 or f_total == 0:
+        return np.nan
+    overlap = (rabbits.astype(np.float64) * foxes).sum()
+    return rabbits.size * overlap / (float(r_total) * float(f_total))
+
+
+class SpatialMetrics:
+    """
+    Per-generation spatial summary of a Field.
+    Attach with Field(spatial_resolution=...) or field.spatial = SpatialMetrics(...)
+    and update(field) is called at the end of every generation.
+    """
+
+    def __init__(self, resolution=10):
+        self.resolution = resolution
+        self.size = None
+        self.generations = []
+        self.grass = []  # float32 fraction of grass cover per block
+        self.rabbits = []  # uint32 rabbit count per block
+        self.foxes = []  # uint32 fox count per block
+        self.rabbit_clustering = []
+        self.fox_clustering = []
+        self.colocation = []
+
+    def update(self, field):
+        size = self.size = field.field.shape[0]
+        res = self.resolution
+        if hasattr(field.field, "block_mean"):
+            grass = field.field.block_mean(res)
+        else:
+            grass = block_mean(field.field, res)
+        rabbits = block_counts(field.rabbits, size, res)
+        foxes = block_counts(field.foxes, size, res)
+
+        self.generations.append(field.generation_count)
+        self.grass.append(grass.astype(np.float32))
+        self.rabbits.append(rabbits.astype(np.uint32))
+        self.foxes.append(foxes.astype(np.uint32))
+        self.rabbit_clustering.append(morisita(rabbits))
+        self.fox_clustering.append(morisita(foxes))
+        self.colocation.append(colocation(rabbits, foxes))
+
+    def density(self, species="rabbits"):
+        """Animals per cell for every recorded generation, shape (gens, res, res)"""
+        return np.stack(getattr(self, species)) / self.block_areas()
+
+    def block_areas(self):
+        """Number of cells in each block"""
+        sizes = np.diff(np.append(block_edges(self.size, self.resolution), self.size))
+        return np.outer(sizes, sizes)
+
+    def arrays(self):
+        """Everything recorded so far as stacked numpy arrays"""
+        return {
+            "generation": np.asarray(self.generations, dtype=np.int64),
+            "grass": np.stack(self.grass),
+            "rabbits": np.stack(self.rabbits),
+            "foxes": np.stack(self.foxes),
+            "rabbit_clustering": np.asarray(self.rabbit_clustering),
+            "fox_clustering": np.asarray(self.fox_clustering),
+            "colocation": np.asarray(self.colocation),
+        }
+
+    def save(self, path):
+        np.savez_compressed(
+            path, resolution=self.resolution, size=self.size, **self.arrays()
+        )
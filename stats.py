@@ -0,0 +1,261 @@
+"""
+Streaming population statistics for the foxes vs. rabbits model.
+
+Everything here is updated in O(1) per generation and never keeps the raw
+time series, so a long run (or thousands of runs) can be summarised without
+holding rabbit_history / fox_history in memory. Accumulators from separate
+runs can be merged, which is how a parameter sweep builds ensemble summaries.
+"""
+
+import math
+
+DEFAULT_LAGS = (0, 1, 2, 5, 10, 20, 50)
+
+
+# =========== Running moments ============
+
+
+class RunningStats:
+    """Welford running mean / variance plus min and max"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def merge(self, other):
+        """
+        Combine two accumulators (Chan et al. parallel update).
+        Returns a new RunningStats, neither input is changed.
+        """
+        out = RunningStats()
+        out.n = self.n + other.n
+        if out.n == 0:
+            return out
+        delta = other.mean - self.mean
+        out.mean = self.mean + delta * other.n / out.n
+        out.m2 = self.m2 + other.m2 + delta * delta * self.n * other.n / out.n
+        out.min = min(self.min, other.min)
+        out.max = max(self.max, other.max)
+        return out
+
+    def summary(self):
+        return {
+            "n": self.n,
+            "mean": self.mean,
+            "std": self.std,
+            "min": self.min if self.n else None,
+            "max": self.max if self.n else None,
+        }
+
+
+# =========== Cross-correlation ============
+
+
+class _CoMoment:
+    """Running means, variances and covariance of (x, y) pairs"""
+
+    def __init__(self):
+        self.n = 0
+        self.mx = 0.0
+        self.my = 0.0
+        self.m2x = 0.0
+        self.m2y = 0.0
+        self.cxy = 0.0
+
+    def update(self, x, y):
+        self.n += 1
+        dx = x - self.mx
+        dy = y - self.my
+        self.mx += dx / self.n
+        self.my += dy / self.n
+        self.m2x += dx * (x - self.mx)
+        self.m2y += dy * (y - self.my)
+        self.cxy += dx * (y - self.my)
+
+    def merge(self, other):
+        out = _CoMoment()
+        out.n = self.n + other.n
+        if out.n == 0:
+            return out
+        dx = other.mx - self.mx
+        dy = other.my - self.my
+        w = self.n * other.n / out.n
+        out.mx = self.mx + dx * other.n / out.n
+        out.my = self.my + dy * other.n / out.n
+        out.m2x = self.m2x + other.m2x + dx * dx * w
+        out.m2y = self.m2y + other.m2y + dy * dy * w
+        out.cxy = self.cxy + other.cxy + dx * dy * w
+        return out
+
+    def correlation(self):
+        if self.n < 2 or self.m2x <= 0 or self.m2y <= 0:
+            return None
+        return self.cxy / math.sqrt(self.m2x * self.m2y)
+
+
+class CrossCorrelation:
+    """
+    Pearson correlation between rabbits(t - lag) and foxes(t) for a fixed set
+    of lags. Only the last max(lags) rabbit counts are kept (a ring buffer),
+    so the cost per generation is O(len(lags)) regardless of run length.
+    Positive lags mean foxes follow rabbits.
+    """
+
+    def __init__(self, lags=DEFAULT_LAGS):
+        self.lags = tuple(sorted(set(lags)))
+        if self.lags and self.lags[0] < 0:
+            raise ValueError("lags must be non-negative")
+        self.moments = {lag: _CoMoment() for lag in self.lags}
+        self._size = max(self.lags, default=0) + 1
+        self._ring = [0.0] * self._size
+        self._t = 0
+
+    def update(self, rabbits, foxes):
+        self._ring[self._t % self._size] = rabbits
+        for lag in self.lags:
+            if lag <= self._t:
+                past = self._ring[(self._t - lag) % self._size]
+                self.moments[lag].update(past, foxes)
+        self._t += 1
+
+    def merge(self, other):
+        """
+        Pool the pairs of two runs. Pairs are never formed across runs, so the
+        merged object is a summary only and should not be updated further.
+        """
+        if self.lags != other.lags:
+            raise ValueError("cannot merge cross-correlations with different lags")
+        out = CrossCorrelation(self.lags)
+        out.moments = {
+            lag: self.moments[lag].merge(other.moments[lag]) for lag in self.lags
+        }
+        return out
+
+    def summary(self):
+        return {lag: self.moments[lag].correlation() for lag in self.lags}
+
+
+# =========== Oscillation period ============
+
+
+class PeriodEstimator:
+    """
+    Dominant oscillation period from upward crossings of the running mean.
+    Each time the series rises through its mean, the number of generations
+    since the previous upward crossing is one period sample. Small wiggles
+    around the mean are ignored with a hysteresis band of `band` standard
+    deviations: the series has to drop below it before a new crossing counts.
+    """
+
+    def __init__(self, band=0.1):
+        self.band = band
+        self.level = RunningStats()
+        self.periods = RunningStats()
+        self._t = 0
+        self._last_crossing = None
+        self._armed = False
+
+    def update(self, x):
+        self.level.update(x)
+        mean = self.level.mean
+        width = self.band * self.level.std
+        if x < mean - width:
+            self._armed = True
+        elif self._armed and x > mean + width:
+            if self._last_crossing is not None:
+                self.periods.update(self._t - self._last_crossing)
+            self._last_crossing = self._t
+            self._armed = False
+        self._t += 1
+
+    def merge(self, other):
+        out = PeriodEstimator(self.band)
+        out.level = self.level.merge(other.level)
+        out.periods = self.periods.merge(other.periods)
+        return out
+
+    def summary(self):
+        return {
+            "period": self.periods.mean if self.periods.n else None,
+            "period_std": self.periods.std if self.periods.n else None,
+            "cycles": self.periods.n,
+        }
+
+
+# =========== Population statistics ============
+
+
+class PopulationStats:
+    """
+    All accumulators for one run of the model.
+    Attach to a Field (field.stats = PopulationStats()) and it is updated at
+    the end of every generation. Merge the stats of several runs with
+    merge() or merge_all() to summarise an ensemble.
+    """
+
+    def __init__(self, lags=DEFAULT_LAGS, band=0.1):
+        self.rabbits = RunningStats()
+        self.foxes = RunningStats()
+        self.xcorr = CrossCorrelation(lags)
+        self.rabbit_period = PeriodEstimator(band)
+        self.fox_period = PeriodEstimator(band)
+        self.runs = 1
+
+    def update(self, rabbits, foxes):
+        self.rabbits.update(rabbits)
+        self.foxes.update(foxes)
+        self.xcorr.update(rabbits, foxes)
+        self.rabbit_period.update(rabbits)
+        self.fox_period.update(foxes)
+
+    def merge(self, other):
+        out = PopulationStats(self.xcorr.lags, self.rabbit_period.band)
+        out.rabbits = self.rabbits.merge(other.rabbits)
+        out.foxes = self.foxes.merge(other.foxes)
+        out.xcorr = self.xcorr.merge(other.xcorr)
+        out.rabbit_period = self.rabbit_period.merge(other.rabbit_period)
+        out.fox_period = self.fox_period.merge(other.fox_period)
+        out.runs = self.runs + other.runs
+        return out
+
+    def summary(self):
+        return {
+            "runs": self.runs,
+            "rabbits": {**self.rabbits.summary(), **self.rabbit_period.summary()},
+            "foxes": {**self.foxes.summary(), **self.fox_period.summary()},
+            "xcorr": self.xcorr.summary(),
+        }
+
+
+def merge_all(stats):
+    """Merge any number of PopulationStats (e.g. one per run of a sweep)"""
+    stats = list(stats)
+    if not stats:
+        empty = PopulationStats()
+        empty.runs = 0
+        return empty
+    out = stats[0]
+    for s in stats[1:]:
+        out = out.merge(s)
+    return out